@@ -0,0 +1,272 @@
+// _apl
+//
+// Average path length (APL) kernels over CSR graphs, loaded by capl.py
+// through ctypes. Build with scripts/build-apl.sh.
+//
+// Like kernels.apl_bitparallel, sources are searched in blocks of 64: bit k
+// of seen[v] indicates that the k-th source of the block has reached v. Each
+// step either pushes frontier masks along the out-edges of frontier nodes or
+// pulls them along the in-edges of nodes not yet reached by all sources,
+// whichever is expected to examine fewer edges. Frontier nodes are kept in a
+// bitmap and iterated word by word, extracting set bits with __builtin_ctzll
+// (tzcnt). Blocks are searched in parallel with OpenMP.
+
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+// Push when the frontier's out-edges are fewer than (in-edges of nodes not
+// reached by all sources / ALPHA)
+
+#define ALPHA 4
+
+#define ALL (~0ULL)
+
+// Version of the exported function signatures, checked by capl.py (bump on
+// any interface change)
+
+#define APL_ABI_VERSION 2
+
+typedef struct {
+    uint64_t *seen, *frontier, *next;  // per node source masks
+    uint64_t *fbits, *nbits;           // frontier node bitmaps
+} scratch_t;
+
+static int64_t search_block(const int32_t *indptr, const int32_t *indices,
+                            const int32_t *t_indptr, const int32_t *t_indices,
+                            int32_t n, const uint8_t *active, int64_t nactive,
+                            const int32_t *srcs, int nsrc, scratch_t *s) {
+
+    // Return sum of path lengths from srcs[0..nsrc) to all reachable active
+    // nodes
+
+    size_t nwords = ((size_t) n + 63) / 64;
+    uint64_t *seen = s->seen, *frontier = s->frontier, *next = s->next;
+    uint64_t *fbits = s->fbits, *nbits = s->nbits;
+
+    // Masks of active nodes start with the bits of missing sources set and
+    // masks of inactive nodes with all bits set, so a node has been reached
+    // by every source of the block iff its mask is ALL
+
+    uint64_t full = nsrc == 64 ? ALL : (1ULL << nsrc) - 1;
+
+    for (int32_t v = 0; v < n; ++v)
+        seen[v] = active[v] ? ~full : ALL;
+
+    memset(frontier, 0, n * sizeof(uint64_t));
+    memset(next, 0, n * sizeof(uint64_t));
+    memset(fbits, 0, nwords * sizeof(uint64_t));
+    memset(nbits, 0, nwords * sizeof(uint64_t));
+
+    int64_t frontier_edges = 0;  // out-edges of frontier nodes
+    int64_t unsat_edges = 0;     // in-edges of nodes not reached by all
+
+    for (int k = 0; k < nsrc; ++k) {
+        int32_t src = srcs[k];
+        seen[src] |= 1ULL << k;
+        frontier[src] = 1ULL << k;
+        fbits[src >> 6] |= 1ULL << (src & 63);
+        frontier_edges += indptr[src + 1] - indptr[src];
+    }
+
+    for (int32_t v = 0; v < n; ++v)
+        if (seen[v] != ALL)
+            unsat_edges += t_indptr[v + 1] - t_indptr[v];
+
+    int64_t undiscovered = (nactive - 1) * nsrc;
+    int64_t plsum = 0;
+
+    for (int64_t depth = 1; undiscovered; depth++) {
+
+        int64_t discovered = 0;
+        int push = frontier_edges * ALPHA < unsat_edges;
+
+        frontier_edges = 0;
+
+        if (push) {
+
+            // next is non-zero only at the nodes of nbits (the frontier of
+            // the previous step)
+
+            for (size_t w = 0; w < nwords; ++w) {
+                uint64_t x = nbits[w];
+                while (x) {
+                    next[w * 64 + __builtin_ctzll(x)] = 0;
+                    x &= x - 1;
+                }
+                nbits[w] = 0;
+            }
+
+            for (size_t w = 0; w < nwords; ++w) {
+                uint64_t x = fbits[w];
+                while (x) {
+                    int32_t v = (int32_t) (w * 64 + __builtin_ctzll(x));
+                    uint64_t f = frontier[v];
+                    for (int32_t k = indptr[v]; k < indptr[v + 1]; ++k) {
+                        int32_t u = indices[k];
+                        next[u] |= f;
+                        nbits[u >> 6] |= 1ULL << (u & 63);
+                    }
+                    x &= x - 1;
+                }
+            }
+
+            for (size_t w = 0; w < nwords; ++w) {
+                uint64_t x = nbits[w];
+                while (x) {
+                    int b = __builtin_ctzll(x);
+                    int32_t u = (int32_t) (w * 64 + b);
+                    uint64_t mask = next[u] & ~seen[u];
+                    next[u] = mask;
+                    if (mask) {
+                        seen[u] |= mask;
+                        discovered += __builtin_popcountll(mask);
+                        frontier_edges += indptr[u + 1] - indptr[u];
+                        if (seen[u] == ALL)
+                            unsat_edges -= t_indptr[u + 1] - t_indptr[u];
+                    } else {
+                        nbits[w] &= ~(1ULL << b);
+                    }
+                    x &= x - 1;
+                }
+            }
+
+        } else {
+
+            memset(nbits, 0, nwords * sizeof(uint64_t));
+
+            for (int32_t v = 0; v < n; ++v) {
+                uint64_t unseen = ~seen[v];
+                uint64_t mask = 0;
+                if (unseen) {
+                    for (int32_t k = t_indptr[v]; k < t_indptr[v + 1]; ++k) {
+                        mask |= frontier[t_indices[k]];
+                        if (!(unseen & ~mask))
+                            break;
+                    }
+                    mask &= unseen;
+                }
+                next[v] = mask;
+                if (mask) {
+                    seen[v] |= mask;
+                    discovered += __builtin_popcountll(mask);
+                    nbits[v >> 6] |= 1ULL << (v & 63);
+                    frontier_edges += indptr[v + 1] - indptr[v];
+                    if (seen[v] == ALL)
+                        unsat_edges -= t_indptr[v + 1] - t_indptr[v];
+                }
+            }
+        }
+
+        if (!discovered)
+            break;
+
+        plsum += depth * discovered;
+        undiscovered -= discovered;
+
+        uint64_t *tmp = frontier;
+        frontier = next;
+        next = tmp;
+
+        tmp = fbits;
+        fbits = nbits;
+        nbits = tmp;
+    }
+
+    return plsum;
+}
+
+int apl_abi_version(void) {
+    return APL_ABI_VERSION;
+}
+
+int64_t apl_csr_mask(const int32_t *indptr, const int32_t *indices,
+                     const int32_t *t_indptr, const int32_t *t_indices,
+                     int32_t n, const uint8_t *active, int nthreads) {
+
+    // Return sum of all shortest path lengths between active nodes, or -1 if
+    // scratch memory could not be allocated. Blocks of sources are searched
+    // by nthreads threads (all available if nthreads <= 0)
+
+    int32_t *srcs = malloc(((size_t) n + 1) * sizeof(int32_t));
+
+    if (!srcs)
+        return -1;
+
+    int64_t nactive = 0;
+
+    for (int32_t v = 0; v < n; ++v)
+        if (active[v])
+            srcs[nactive++] = v;
+
+    int64_t nblocks = (nactive + 63) / 64;
+    int64_t total = 0;
+    int failed = 0;
+
+#ifdef _OPENMP
+    if (nthreads <= 0)
+        nthreads = omp_get_max_threads();
+#else
+    (void) nthreads;
+#endif
+
+    #pragma omp parallel num_threads(nthreads) reduction(+:total)
+    {
+        size_t nwords = ((size_t) n + 63) / 64;
+        uint64_t *buffers = malloc((3 * (size_t) n + 2 * nwords + 1) *
+                                   sizeof(uint64_t));
+
+        scratch_t s = {NULL, NULL, NULL, NULL, NULL};
+
+        if (buffers) {
+            s.seen = buffers;
+            s.frontier = buffers + n;
+            s.next = buffers + 2 * (size_t) n;
+            s.fbits = buffers + 3 * (size_t) n;
+            s.nbits = buffers + 3 * (size_t) n + nwords;
+        } else {
+            #pragma omp atomic write
+            failed = 1;
+        }
+
+        #pragma omp for schedule(dynamic)
+        for (int64_t block = 0; block < nblocks; ++block) {
+            if (!buffers)
+                continue;
+            int64_t start = block * 64;
+            int nsrc = nactive - start < 64 ? (int) (nactive - start) : 64;
+            total += search_block(indptr, indices, t_indptr, t_indices, n,
+                                  active, nactive, srcs + start, nsrc, &s);
+        }
+
+        free(buffers);
+    }
+
+    free(srcs);
+    return failed ? -1 : total;
+}
+
+int64_t apl_csr(const int32_t *indptr, const int32_t *indices,
+                const int32_t *t_indptr, const int32_t *t_indices, int32_t n,
+                int nthreads) {
+
+    // Return sum of all shortest path lengths, or -1 if scratch memory could
+    // not be allocated
+
+    uint8_t *active = malloc((size_t) n + 1);
+
+    if (!active)
+        return -1;
+
+    memset(active, 1, (size_t) n + 1);
+
+    int64_t total = apl_csr_mask(indptr, indices, t_indptr, t_indices, n,
+                                 active, nthreads);
+
+    free(active);
+    return total;
+}
@@ -0,0 +1,76 @@
+import os
+import ctypes
+import numpy as np
+
+
+lib_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_apl.so")
+
+ABI_VERSION = 2  # must match APL_ABI_VERSION in _apl.c
+
+try:
+    _lib = ctypes.CDLL(lib_file)
+except OSError:
+    raise ImportError("C kernels not built (see scripts/build-apl.sh)")
+
+try:
+    _lib.apl_abi_version.restype = ctypes.c_int
+    _lib_version = _lib.apl_abi_version()
+except AttributeError:
+    _lib_version = None
+
+if _lib_version != ABI_VERSION:
+    raise ImportError("C kernels are out of date, rebuild them with "
+                      "scripts/build-apl.sh")
+
+_int32_p = ctypes.POINTER(ctypes.c_int32)
+_uint8_p = ctypes.POINTER(ctypes.c_uint8)
+
+_lib.apl_csr.restype = ctypes.c_int64
+_lib.apl_csr.argtypes = [_int32_p, _int32_p, _int32_p, _int32_p,
+                         ctypes.c_int32, ctypes.c_int]
+
+_lib.apl_csr_mask.restype = ctypes.c_int64
+_lib.apl_csr_mask.argtypes = [_int32_p, _int32_p, _int32_p, _int32_p,
+                              ctypes.c_int32, _uint8_p, ctypes.c_int]
+
+
+def _csr_args(indptr, indices, t_indptr, t_indices):
+    # return the (contiguous) arrays too, so that callers keep them alive
+    # while the kernel runs
+    arrays = [np.ascontiguousarray(arr, np.int32)
+              for arr in (indptr, indices, t_indptr, t_indices)]
+    return arrays, [arr.ctypes.data_as(_int32_p) for arr in arrays]
+
+
+def _check(total):
+    if total < 0:
+        raise MemoryError("Could not allocate APL search buffers")
+    return total
+
+
+def apl_bitparallel(indptr, indices, t_indptr, t_indices, n):
+    """Calculate the sum of all shortest path lengths of a graph.
+
+    Same interface as `kernels.apl_bitparallel`. Blocks of 64 sources are
+    searched in parallel by all available threads.
+
+    """
+    arrays, ptrs = _csr_args(indptr, indices, t_indptr, t_indices)
+    return _check(_lib.apl_csr(*(ptrs + [n, 0])))
+
+
+def impact_csr(indptr, indices, t_indptr, t_indices, n, disabled):
+    """Calculate the APL impact of disabling a subset of graph nodes.
+
+    Same interface as `kernels.impact_csr`. Runs single-threaded and the GIL
+    is released while the C kernel runs, so trials can be calculated
+    concurrently from a thread pool.
+
+    """
+    arrays, ptrs = _csr_args(indptr, indices, t_indptr, t_indices)
+    active = np.ones(n, np.uint8)
+    active[disabled] = 0
+    n_active = int(active.sum())
+    total = _lib.apl_csr_mask(*(ptrs + [n, active.ctypes.data_as(_uint8_p),
+                                        1]))
+    return _check(total) / float(n_active * (n_active - 1))
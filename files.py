@@ -16,7 +16,7 @@ def write_file(file, content):
 def read_csv(file, type_=str):
     content = read_file(file)
     lines = content.strip().split("\n")
-    rows = [map(type_, line.split(",")) for line in lines]
+    rows = [list(map(type_, line.split(","))) for line in lines]
     return rows
 
 
@@ -7,6 +7,7 @@ from operator import mul
 from generator import generate_xml
 from itertools import product
 from collections import defaultdict
+from functools import reduce
 
 usage = """gml.py
 
@@ -66,8 +67,8 @@ def generate_full(n):
     """
     get_name = lambda ind: "n%d" % ind
     get_edges = lambda ind: range(ind + 1, n)
-    nodes = map(get_name, range(n))
-    edges = {get_name(ind): map(get_name, get_edges(ind)) for ind in range(n)}
+    nodes = [get_name(ind) for ind in range(n)]
+    edges = {get_name(ind): [get_name(x) for x in get_edges(ind)] for ind in range(n)}
     return Graph(nodes, edges)
 
 
@@ -150,7 +151,7 @@ def generate_hypercube(sides, fold=False):
 
         for d in reversed(range(dimensions)):
             weight = get_weight(d)
-            subs[d] = remainder / weight
+            subs[d] = remainder // weight
             remainder -= subs[d] * weight
 
         return subs
@@ -172,7 +173,7 @@ def generate_hypercube(sides, fold=False):
     # Create graph
 
     edges = defaultdict(list)
-    nodes = range(n)
+    nodes = list(range(n))
 
     for ind in nodes:
         subs = ind2sub(ind)
@@ -246,7 +247,7 @@ def main():
         graph = generate_hypercube([length, width, height], fold)
 
     elif args["hypercube"]:
-        sides = map(int, args["<side>"])
+        sides = [int(side) for side in args["<side>"]]
         fold = args["--fold"]
         graph = generate_hypercube(sides, fold)
 
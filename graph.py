@@ -1,5 +1,9 @@
-from xml.etree import cElementTree as ET
+import numpy as np
+
+from array import array
+from collections import Counter
 from collections import defaultdict
+from xml.parsers import expat
 
 
 class Graph():
@@ -15,7 +19,8 @@ class Graph():
             nodes (list): list of node objects.
             edges (list): list of edges, each as (node, node).
 
-        `edges` can alternatively be provided as a dict(node -> node).
+        `edges` can alternatively be provided as a dict(node -> node). Edges
+        with an endpoint that is not in `nodes` are ignored.
 
         """
 
@@ -35,48 +40,156 @@ class Graph():
 
     def _init_nodes_edges(self, nodes, edges):
         self.nodes = nodes
-        if type(edges) is list: self.set_edge_list(edges)
-        else: self.edges = edges
+        if type(edges) is list:
+            self.set_edge_list(edges)
+            return
+        self._index_nodes()
+        id_to_idx = self.id_to_idx
+        pairs = np.array([
+            (ind, id_to_idx[dst])
+            for ind, node in enumerate(self.idx_to_id)
+            for dst in edges.get(node, ()) if dst in id_to_idx
+        ], np.int32).reshape(-1, 2)
+        self._build_csr(pairs[:, 0], pairs[:, 1])
 
     def _load_graphml(self, graphml):
         """Load nodes and edges from a GraphML description.
 
+        The description is parsed in a single pass with expat, without
+        building any element objects. Node ids are mapped to indices as they
+        are read and edges are collected directly into int arrays.
+
         Args:
             graphml (str): content of a GraphML file.
 
         """
-        tree = ET.ElementTree(ET.fromstring(graphml))
-        root_elems = [elem for elem in tree.getroot() if elem.tag.endswith("graph")]
-        assert root_elems, "Could not find <graph> element"
-        root = root_elems[0]
-        namespaces = {"graphml": "http://graphml.graphdrawing.org/xmlns"}
-        edge_default = root.attrib.get("edgedefault", "directed")
-
-        self.nodes = [
-            node.attrib["id"]
-            for node in root.findall("graphml:node", namespaces)
-        ]
+        node_tag = "http://graphml.graphdrawing.org/xmlns node"
+        edge_tag = "http://graphml.graphdrawing.org/xmlns edge"
+        graph_tag = "http://graphml.graphdrawing.org/xmlns graph"
+
+        nodes = []  # node ids, in order of declaration
+        index = {}  # node id -> index, in order of first reference
+        srcs = array("i")
+        dsts = array("i")
+        edge_default = []
+
+        def start_element(tag, attrib):
+            if tag == node_tag:
+                node = attrib["id"]
+                nodes.append(node)
+                index.setdefault(node, len(index))
+            elif tag == edge_tag:
+                src, dst = attrib["source"], attrib["target"]
+                try:
+                    src_ind, dst_ind = index[src], index[dst]
+                except KeyError:
+                    src_ind = index.setdefault(src, len(index))
+                    dst_ind = index.setdefault(dst, len(index))
+                srcs.append(src_ind)
+                dsts.append(dst_ind)
+            elif tag == graph_tag and not edge_default:
+                edge_default.append(attrib.get("edgedefault", "directed"))
+
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.StartElementHandler = start_element
+        parser.Parse(graphml, True)
+
+        assert edge_default, "Could not find <graph> element"
+
+        self.nodes = nodes
+        self._index_nodes()
 
-        edge_list = [(e.attrib["source"], e.attrib["target"])
-                     for e in root.findall("graphml:edge", namespaces)]
+        assert len(self.id_to_idx) == len(nodes), "Duplicate node id '%s'" % \
+            next(node for node, count in Counter(nodes).items() if count > 1)
 
-        if edge_default == "undirected":
-            reversed_edges = [(dst, src) for src, dst in edge_list]
-            edge_list += reversed_edges
+        assert len(index) == len(nodes), "Undeclared node '%s' in edge" % \
+            next(node for node in index if node not in self.id_to_idx)
 
-        self.set_edge_list(edge_list)
+        # renumber edge endpoints by node declaration order (edges may refer
+        # to nodes before they are declared)
+
+        remap = np.empty(len(index), np.int32)
+        remap[[index[node] for node in self.idx_to_id]] = np.arange(len(index))
+        src = remap[np.frombuffer(srcs, np.int32)]
+        dst = remap[np.frombuffer(dsts, np.int32)]
+
+        if edge_default[0] == "undirected":
+            src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+
+        self._build_csr(src, dst)
 
     def set_edge_list(self, edge_list):
         """Load edges from an edge list.
 
+        Edges with an endpoint that is not in `self.nodes` are ignored.
+
         Args:
             edge_list ([(node, node)]): edge list.
 
         """
-        self.edges = defaultdict(set)
+        self._index_nodes()
+        id_to_idx = self.id_to_idx
+        pairs = np.array([
+            (id_to_idx[src], id_to_idx[dst])
+            for src, dst in edge_list
+            if src in id_to_idx and dst in id_to_idx
+        ], np.int32).reshape(-1, 2)
+        self._build_csr(pairs[:, 0], pairs[:, 1])
 
-        for src, dst in edge_list:
-            self.edges[src].add(dst)
+    def _index_nodes(self):
+        """Number nodes by their position in `self.nodes`.
+
+        `idx_to_id[i]` is the name of node `i` and `id_to_idx` is the inverse
+        mapping.
+
+        """
+        self.idx_to_id = list(self.nodes)
+        self.id_to_idx = {node: ind for ind, node in enumerate(self.idx_to_id)}
+
+    def _build_csr(self, src, dst):
+        """Build a compressed sparse row (CSR) adjacency representation.
+
+        This is the only adjacency representation kept by the graph (node
+        names are only used to translate to and from indices, see
+        `_index_nodes`).
+
+        The neighbors of node `i` are `indices[indptr[i]:indptr[i+1]]`, sorted
+        in ascending order. Duplicate edges are dropped.
+
+        The in-neighbors of each node are similarly kept in `t_indptr` and
+        `t_indices` (the CSR of the transposed graph). For undirected graphs
+        these are the same arrays as `indptr` and `indices`.
+
+        Args:
+            src (np.ndarray): source node index of each edge.
+            dst (np.ndarray): target node index of each edge.
+
+        """
+        n = len(self.idx_to_id)
+        src = np.asarray(src, np.int64)
+        dst = np.asarray(dst, np.int64)
+
+        keys = np.sort(src * n + dst)  # sorted by source, then target
+        keys = keys[np.diff(keys, prepend=-1) != 0]  # drop duplicates
+        src, dst = keys // n, keys % n
+
+        self.indptr = np.zeros(n + 1, np.int32)
+        self.indptr[1:] = np.cumsum(np.bincount(src, minlength=n))
+        self.indices = dst.astype(np.int32)
+
+        t_keys = np.sort(dst * n + src)  # sorted by target, then source
+
+        t_indptr = np.zeros(n + 1, np.int32)
+        t_indptr[1:] = np.cumsum(np.bincount(dst, minlength=n))
+        t_indices = (t_keys % n).astype(np.int32)
+
+        symmetric = np.array_equal(t_indptr, self.indptr) and \
+            np.array_equal(t_indices, self.indices)
+
+        if symmetric:
+            self.t_indptr, self.t_indices = self.indptr, self.indices
+        else:
+            self.t_indptr, self.t_indices = t_indptr, t_indices
 
     def reduce_graph(self, predicate):
         """Return a copy graph with a subset of nodes.
@@ -91,25 +204,45 @@ class Graph():
 
         """
 
-        nodes = filter(predicate, self.nodes)
+        keep = [bool(predicate(node)) for node in self.idx_to_id]
+        nodes = [node for node, kept in zip(self.idx_to_id, keep) if kept]
 
-        edge_list = [(src, dst) for src, dst in self.get_edge_list()
-                     if (src in nodes and dst in nodes)]
+        edge_list = [
+            (self.idx_to_id[src], self.idx_to_id[dst])
+            for src in range(len(keep)) if keep[src]
+            for dst in self.indices[self.indptr[src]:self.indptr[src+1]]
+            if keep[dst]
+        ]
 
         return Graph(nodes, edge_list)
 
     def get_edge_list(self):
-        """Return a list of graph edges."""
-        result = list()
-        for src in sorted(self.edges.keys()):
-            destinations = sorted(self.edges[src])
-            for dst in destinations:
-                result.append((src, dst))
-        return result
+        """Return a list of graph edges (sorted by source and target names)."""
+        names = self.idx_to_id
+        n = len(names)
+
+        # rank[i] is the position of node i when nodes are sorted by name
+
+        rank = np.empty(n, np.int64)
+        rank[sorted(range(n), key=names.__getitem__)] = np.arange(n)
+
+        srcs = np.repeat(np.arange(n), np.diff(self.indptr))
+        order = np.lexsort((rank[self.indices], rank[srcs]))
+
+        return [
+            (names[src], names[dst])
+            for src, dst in zip(srcs[order].tolist(),
+                                self.indices[order].tolist())
+        ]
+
+    def __contains__(self, node):
+        """Return True iff `node` is a node of the graph."""
+        return node in self.id_to_idx
 
     def get_outdegree(self, node):
         """Return outdegree of `node`."""
-        return len(self.edges[node])
+        ind = self.id_to_idx[node]
+        return int(self.indptr[ind+1] - self.indptr[ind])
 
     def map_node_names(self, name_map):
         """Rename graph nodes based on a name map.
@@ -122,9 +255,9 @@ class Graph():
             src, dst = edge
             return (name_map[src], name_map[dst])
 
-        new_edge_list = map(rename_edge, self.get_edge_list())
+        new_edge_list = [rename_edge(edge) for edge in self.get_edge_list()]
 
-        self.nodes = name_map.values()
+        self.nodes = list(name_map.values())
         self.set_edge_list(new_edge_list)
 
     def rename_nodes(self, name_format="n%d"):
@@ -0,0 +1,223 @@
+import numpy as np
+
+from numba import njit
+from numba import prange
+
+
+# Searches push frontier masks when the frontier's out-edges are fewer than
+# (in-edges of nodes not reached by every source / ALPHA), and pull them
+# otherwise.
+
+ALPHA = 4
+
+ALL = np.uint64(0xffffffffffffffff)  # mask of a node reached by all sources
+
+
+@njit(cache=True)
+def _popcount(x):
+    """Return number of set bits in a uint64 word."""
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + \
+        ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0f0f0f0f0f0f0f0f)
+    return np.int64((x * np.uint64(0x0101010101010101)) >> np.uint64(56))
+
+
+@njit(nogil=True, cache=True, boundscheck=False)
+def _search_block(indptr, indices, t_indptr, t_indices, active, nactive,
+                  srcs):
+    """Run a bit-parallel breadth-first search from up to 64 sources.
+
+    Bit k of `seen[v]` indicates that source `srcs[k]` has reached `v`. Masks
+    of active nodes start with the bits of missing sources set and masks of
+    inactive nodes with all bits set, so `v` has been reached by every source
+    iff `seen[v]` is ALL (and inactive nodes are never reached nor expanded).
+
+    Each step either pushes the frontier masks along the out-edges of frontier
+    nodes, or pulls them along the in-edges of nodes not yet reached by every
+    source (stopping at the first in-edges that complete a node's mask),
+    whichever is expected to examine fewer edges. The search stops as soon as
+    all sources have reached every node.
+
+    Args:
+        indptr (np.ndarray): CSR row pointers.
+        indices (np.ndarray): CSR column indices.
+        t_indptr (np.ndarray): row pointers of the transposed graph.
+        t_indices (np.ndarray): column indices of the transposed graph.
+        active (np.ndarray): uint8 array, zero for disabled nodes.
+        nactive (int): number of active nodes.
+        srcs (np.ndarray): int32 array of (at most 64) active source nodes.
+
+    Returns:
+        int: sum of path lengths from the sources to all reachable active
+        nodes.
+
+    """
+    n = len(indptr) - 1
+    nsrc = len(srcs)
+    one = np.uint64(1)
+    full = ALL if nsrc == 64 else (one << np.uint64(nsrc)) - one
+
+    seen = np.empty(n, np.uint64)
+    for v in range(n):
+        seen[v] = ~full if active[v] else ALL
+    frontier = np.zeros(n, np.uint64)
+    next_frontier = np.zeros(n, np.uint64)
+    flist = np.empty(n, np.int32)  # frontier nodes
+    nlist = np.empty(n, np.int32)  # next frontier nodes
+
+    flen = 0
+    frontier_edges = 0  # out-edges of frontier nodes
+    for k in range(nsrc):
+        src = srcs[k]
+        bit = np.uint64(1) << np.uint64(k)
+        seen[src] |= bit
+        frontier[src] = bit
+        flist[flen] = src
+        flen += 1
+        frontier_edges += indptr[src + 1] - indptr[src]
+
+    unsat_edges = 0  # in-edges of nodes not reached by every source
+    for v in range(n):
+        if seen[v] != ALL:
+            unsat_edges += t_indptr[v + 1] - t_indptr[v]
+
+    plen = 0  # number of nodes in the previous frontier
+    undiscovered = (nactive - 1) * nsrc  # (source, node) pairs not reached
+    depth = 1
+    plsum = 0
+
+    while undiscovered:
+
+        discovered = 0
+        nlen = 0
+        push = frontier_edges * ALPHA < unsat_edges
+        frontier_edges = 0
+
+        if push:
+
+            # next_frontier is non-zero only at the nodes of the previous
+            # frontier (kept in nlist)
+
+            for i in range(plen):
+                next_frontier[nlist[i]] = 0
+
+            for i in range(flen):
+                v = flist[i]
+                f = frontier[v]
+                for k in range(indptr[v], indptr[v + 1]):
+                    u = indices[k]
+                    if next_frontier[u] == 0:
+                        nlist[nlen] = u
+                        nlen += 1
+                    next_frontier[u] |= f
+
+            touched = nlen
+            nlen = 0
+            for i in range(touched):
+                u = nlist[i]
+                mask = next_frontier[u] & ~seen[u]
+                next_frontier[u] = mask
+                if mask:
+                    seen[u] |= mask
+                    discovered += _popcount(mask)
+                    frontier_edges += indptr[u + 1] - indptr[u]
+                    if seen[u] == ALL:
+                        unsat_edges -= t_indptr[u + 1] - t_indptr[u]
+                    nlist[nlen] = u
+                    nlen += 1
+
+        else:
+
+            for v in range(n):
+                unseen = ~seen[v]
+                mask = np.uint64(0)
+                if unseen:
+                    for k in range(t_indptr[v], t_indptr[v + 1]):
+                        mask |= frontier[t_indices[k]]
+                        if not (unseen & ~mask):
+                            break
+                    mask &= unseen
+                next_frontier[v] = mask
+                if mask:
+                    seen[v] |= mask
+                    discovered += _popcount(mask)
+                    frontier_edges += indptr[v + 1] - indptr[v]
+                    if seen[v] == ALL:
+                        unsat_edges -= t_indptr[v + 1] - t_indptr[v]
+                    nlist[nlen] = v
+                    nlen += 1
+
+        if not discovered:
+            break
+
+        plsum += depth * discovered
+        undiscovered -= discovered
+        frontier, next_frontier = next_frontier, frontier
+        flist, nlist = nlist, flist
+        plen = flen
+        flen = nlen
+        depth += 1
+
+    return plsum
+
+
+@njit(parallel=True, cache=True)
+def apl_bitparallel(indptr, indices, t_indptr, t_indices, n):
+    """Calculate the sum of all shortest path lengths of a graph.
+
+    Searches from 64 sources at once (see `_search_block`), with blocks of
+    sources searched in parallel.
+
+    Args:
+        indptr (np.ndarray): CSR row pointers.
+        indices (np.ndarray): CSR column indices.
+        t_indptr (np.ndarray): row pointers of the transposed graph.
+        t_indices (np.ndarray): column indices of the transposed graph.
+        n (int): number of nodes.
+
+    Returns:
+        int: sum of path lengths between all reachable node pairs.
+
+    """
+    active = np.ones(n, np.uint8)
+    total = 0
+    nblocks = (n + 63) // 64
+    for block in prange(nblocks):
+        start = block * 64
+        srcs = np.arange(start, min(n, start + 64)).astype(np.int32)
+        total += _search_block(indptr, indices, t_indptr, t_indices, active,
+                               n, srcs)
+    return total
+
+
+@njit(nogil=True, cache=True, boundscheck=False)
+def impact_csr(indptr, indices, t_indptr, t_indices, n, disabled):
+    """Calculate the APL impact of disabling a subset of graph nodes.
+
+    Searches from 64 active sources at once (see `_search_block`). Runs
+    single-threaded and releases the GIL, so that several trials can be
+    calculated concurrently from a thread pool.
+
+    Args:
+        indptr (np.ndarray): CSR row pointers.
+        indices (np.ndarray): CSR column indices.
+        t_indptr (np.ndarray): row pointers of the transposed graph.
+        t_indices (np.ndarray): column indices of the transposed graph.
+        n (int): number of nodes.
+        disabled (np.ndarray): int32 array of disabled node indices.
+
+    Returns:
+        float: average path length between the remaining nodes.
+
+    """
+    active = np.ones(n, np.uint8)
+    for i in range(len(disabled)):
+        active[disabled[i]] = 0
+    srcs = np.flatnonzero(active).astype(np.int32)
+    n_active = len(srcs)
+    apl = 0
+    for start in range(0, n_active, 64):
+        apl += _search_block(indptr, indices, t_indptr, t_indices, active,
+                             n_active, srcs[start:start + 64])
+    return apl / (n_active * (n_active - 1))
@@ -25,7 +25,7 @@ def parse_csv_content(content):
 
     """
     lines = content.split('\n')
-    matrix = [map(int, line.split(',')) for line in lines]
+    matrix = [list(map(int, line.split(','))) for line in lines]
     return matrix
 
 
@@ -40,7 +40,7 @@ def verify_matrix(matrix):
 def print_matrix(matrix):
     """Print matrix."""
     for row in matrix:
-        print ', '.join(map(str, row))
+        print(', '.join(map(str, row)))
 
 
 def main():
@@ -2,14 +2,19 @@
 
 import os
 import json
+import numpy as np
 
 from graph import Graph
 from files import read_file
 from docopt import docopt
-from random import sample
-from random import randrange
-from collections import Counter
-from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from capl import apl_bitparallel  # C kernels (see scripts/build-apl.sh)
+    from capl import impact_csr
+except ImportError:
+    from kernels import apl_bitparallel
+    from kernels import impact_csr
 
 
 usage = """net.py
@@ -26,7 +31,7 @@ Usage:
 
 Options:
   -i, --info         Print graph traversal information.
-  -w, --workers <n>  Use n parallel workers [default: 1].
+  -w, --workers <n>  Use n parallel workers, 0 for one per CPU [default: 0].
   -p, --psuedo       Use psuedo-randomization.
   -f, --fantasi      Parse FANTASI-formatted node list.
 
@@ -55,9 +60,10 @@ def main():
             nodes = args["<node_list>"].split()
             if args["--fantasi"]:
                 nodes = parse_fantasi_nodes(nodes)
-            non_existent = set(nodes) - set(graph.nodes)
+            non_existent = [node for node in nodes if node not in graph]
             if non_existent:
-                raise Exception("Non-existent node(s): %s" ", ".join(non_existent))
+                raise Exception("Non-existent node(s): %s" %
+                                ", ".join(non_existent))
 
         if args["disable"]:
             disabled = args["<node_list>"].split()
@@ -66,7 +72,7 @@ def main():
             graph = graph.reduce_graph(lambda node: node not in disabled)
             for src, dst in graph.get_edge_list():
                 if src < dst:
-                    print "%s -> %s" % (src, dst)
+                    print("%s -> %s" % (src, dst))
 
         if args["enable"]:
             enabled = args["<node_list>"].split()
@@ -74,190 +80,163 @@ def main():
                 enabled = parse_fantasi_nodes(enabled)
             graph = graph.reduce_graph(lambda node: node in enabled)
 
-        print get_apl(graph, verbose=args["--info"])
+        print(get_apl(graph, verbose=args["--info"]))
 
     elif args["asp"]:
 
-        print calculate_asp(graph)
+        print(calculate_asp(graph))
 
     elif args["dist"]:
 
         dist = calculate_dist(graph)
 
-        for degree in range(max(dist)+1):
-            count = dist[degree]
-            print "%d, %d" % (degree, count)
+        for degree, count in enumerate(dist):
+            print("%d, %d" % (degree, count))
 
     elif args["impact"]:
 
         # random enable/disable
 
-        file = args["<file.graphml>"]
         trials = int(args["<trials>"])
         nworkers = int(args["--workers"])
         node_count = int(args["<node_count>"])
         method = "psuedo" if args["--psuedo"] else "random"
 
-        # calculate how many trials to run in each of (nworkers) tasks
-
-        trials_batch1 = trials / nworkers
-        trials_batch2 = trials - trials_batch1 * (nworkers-1)
-
-        trials_per_task = [trials_batch1] * (nworkers-1) + [trials_batch2]
-
-        # construct task call arguments
-
-        task_args = [{
-            "file": file,
-            "trials": trials,
-            "m": node_count,
-            "method": method
-        } for trials in trials_per_task]
+        impact_list = get_impact_list(graph, trials, node_count, method,
+                                      nworkers)
 
-        pool = Pool(nworkers)
-        task_results = pool.map(get_impact_list_kwargs, task_args)
-        impact_list = sum(task_results, [])  # flatten list of lists
-
-        print json.dumps(impact_list, indent=4)
+        print(json.dumps(impact_list, indent=4))
 
     else:
 
-        print get_apl(graph, verbose=args["--info"])
-
-
-def get_impact(graph, disabled):
-    """Calculate impact of disabling a subset of graph nodes"""
-    n = len(graph.nodes)
-    m = len(disabled)
-    graph_mod = graph.reduce_graph(lambda node: node not in disabled)
-    return get_apl(graph_mod) / float((n-m)*(n-m-1))
-
+        print(get_apl(graph, verbose=args["--info"]))
 
-def get_impact_list_kwargs(kwargs):
-    return get_impact_list(**kwargs)
 
-
-def get_impact_list(file, trials=10, m=1, method="random"):
+def get_impact_list(graph, trials=10, m=1, method="random", nworkers=0):
 
     """Run multiple trials in which m nodes are removed from a graph, and return
-    list of corresponding impact figures."""
+    list of corresponding impact figures.
+
+    Trials are calculated by (nworkers) threads, all sharing the graph's CSR
+    arrays (one thread per CPU if nworkers is 0).
+    """
 
-    graph = Graph(file)
     n = len(graph.nodes)
+    rng = np.random.default_rng()
 
     def get_random_nodes():
-        """Generate samples of m random nodes"""
-        while True:
-            yield sample(graph.nodes, m)
+        """Generate samples of m random node indices (one per row)"""
+        rows = [rng.choice(n, m, replace=False) for _ in range(trials)]
+        return np.array(rows, np.int32).reshape(trials, m)
 
     def get_psuedo_random_nodes():
-        """Generated samples of m psuedo-random nodes"""
-        inds = sample(range(n), m)
-        while True:
-            shift = randrange(1, n)
-            inds = [(x+shift) % n for x in inds]
-            yield [graph.nodes[i] for i in inds]
+        """Generated samples of m psuedo-random node indices (one per row)
+
+        The first sample is random and each subsequent one is the previous
+        sample shifted by a random non-zero offset (modulo n).
+        """
+        inds = rng.choice(n, m, replace=False)
+        shifts = np.cumsum(rng.integers(1, n, size=trials))
+        return ((inds[None, :] + shifts[:, None]) % n).astype(np.int32)
 
     gens = {
         "random": get_random_nodes,
         "psuedo": get_psuedo_random_nodes
     }
 
-    gen = gens[method]()
+    samples = gens[method]()
+
+    indptr, indices = graph.indptr, graph.indices
+    t_indptr, t_indices = graph.t_indptr, graph.t_indices
 
-    def get_impact_w():
-        disabled = next(gen)
-        return get_impact(graph, disabled)
+    def get_impact_w(disabled):
+        return impact_csr(indptr, indices, t_indptr, t_indices, n, disabled)
 
-    return [get_impact_w() for _ in range(trials)]
+    with ThreadPoolExecutor(nworkers or os.cpu_count()) as executor:
+        return list(executor.map(get_impact_w, samples))
+
+
+def _bfs_levels(indptr, indices, src):
+    """Run a level-synchronous breadth-first search over a CSR graph.
+
+    Args:
+        indptr (np.ndarray): CSR row pointers.
+        indices (np.ndarray): CSR column indices.
+        src (int): index of source node.
+
+    Yields:
+        (int, np.ndarray): search depth and indices of nodes discovered at
+        that depth.
+
+    """
+    visited = np.zeros(len(indptr) - 1, np.uint8)
+    visited[src] = 1
+    frontier = np.array([src], np.int32)
+    depth = 1
+    while frontier.size:
+        # gather all frontier adjacency slices with one flat index array
+        starts = indptr[frontier].astype(np.int64)
+        counts = indptr[frontier + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        nbrs = indices[offsets + np.arange(offsets.size)]
+        frontier = np.unique(nbrs[visited[nbrs] == 0])
+        visited[frontier] = 1
+        if frontier.size:
+            yield depth, frontier
+        depth += 1
 
 
 def get_apl(graph, verbose=False):
     """Calculate average path length"""
 
+    if not verbose:
+        return apl_bitparallel(graph.indptr, graph.indices, graph.t_indptr,
+                               graph.t_indices, len(graph.nodes))
+
     total_pl_sum = 0
 
     def log(msg):
         if verbose:
-            print msg
+            print(msg)
 
-    for n in graph.nodes:
+    for src, n in enumerate(graph.nodes):
         log("Searching from node: %s" % n)
-        visited = {n}
-        to_visit = graph.edges[n]
-        depth, node_plsum = 1, 0
-        while to_visit:
-            node_plsum += depth * len(to_visit)
-            visited |= to_visit
-            new_to_visit = set()
-            for m in to_visit:
-                new_to_visit |= graph.edges[m]
-            to_visit = new_to_visit - visited
-            log("  at depth = %d, discovered: %s" % (depth, list(to_visit)))
-            depth += 1
+        node_plsum = 0
+        for depth, frontier in _bfs_levels(graph.indptr, graph.indices, src):
+            node_plsum += depth * frontier.size
+            discovered = [graph.idx_to_id[ind] for ind in frontier]
+            log("  at depth = %d, discovered: %s" % (depth, discovered))
         log("  sum of node path distances = %d" % node_plsum)
         total_pl_sum += node_plsum
     return total_pl_sum
 
 
-def mean(nums):
-    return float(sum(nums)) / len(nums)
-
-
 def calculate_asp(graph):
     """Calculate the all-pair average shortest path of an undirected graph."""
 
-    single_src_asps = [
-        _calculate_asp_single_src(graph, src)
-        for src in list(graph.nodes)
-    ]
-
-    return mean(single_src_asps)
-
-
-def _calculate_asp_single_src(graph, src):
-    """Calculate the average shortest path (for a single src node)."""
-
-    current = {src}
-    visited = set()
-
-    sum_ = 0  # running sum of weighed distanced
-    depth = 1  # current search depth
-
-    while current:
-
-        visited |= current
-        destinations = set()
-
-        for src in current:
-            destinations |= graph.edges[src]
-
-        destinations -= visited
+    n = len(graph.nodes)
 
-        # Accumulate weighed distances
-        sum_ += len(destinations) * depth
-        depth += 1
+    # every node reaches all others iff node 0 reaches (and is reached by) all
 
-        current = destinations
+    csrs = [(graph.indptr, graph.indices), (graph.t_indptr, graph.t_indices)]
 
-    nnodes = len(graph.nodes)
+    for indptr, indices in csrs:
+        levels = _bfs_levels(indptr, indices, 0)
+        nreached = 1 + sum(frontier.size for _, frontier in levels)
+        assert nreached == n, "Graph is disconnected"
 
-    assert len(visited) == nnodes, "Graph is disconnected"
+    apl = apl_bitparallel(graph.indptr, graph.indices, graph.t_indptr,
+                          graph.t_indices, n)
 
-    nodes = list(graph.nodes)
-    npaths = len(visited) - 1
-    return sum_ / npaths
+    return apl / float(n*(n-1))
 
 
 def calculate_dist(graph):
     """Calculate outdegree distrbution of a graph."""
 
-    def get_outdegree(node):
-        return len(graph.edges[node])
-
-    outdegrees = map(get_outdegree, graph.nodes)
+    outdegrees = np.diff(graph.indptr)
 
-    return Counter(outdegrees)
+    return np.bincount(outdegrees)
 
 
 if __name__ == "__main__":
@@ -10,12 +10,13 @@ def prettify_xml(xml):
     try:
         cmd = ['xmllint', '--format', '-']
         pipe = subprocess.PIPE
-        proc = subprocess.Popen(cmd, stdout=pipe, stdin=pipe,stderr=pipe)
+        proc = subprocess.Popen(cmd, stdout=pipe, stdin=pipe,stderr=pipe,
+                                universal_newlines=True)
         output, err = proc.communicate(input=xml)
     except OSError:
         return xml
 
-    if proc.returncode is not 0:
+    if proc.returncode != 0:
         print(err)
         raise Exception("xmllint returned non-zero exit code")
 
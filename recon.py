@@ -1,21 +1,24 @@
 #!/usr/bin/env python
 
-from asp import calculate_dist
+import numpy as np
+
+from net import calculate_dist
 from files import read_csv
 from graph import Graph
 from random import sample
 from random import uniform
+from itertools import chain
 from collections import defaultdict
 
 
 def choose(items):
     """Take random item from a set of items."""
-    return sample(items, 1)[0]
+    return sample(list(items), 1)[0]
 
 
 def choose_biased(items, get_weight):
 
-    weights = map(get_weight, items)
+    weights = list(map(get_weight, items))
     r = uniform(0, sum(weights))
 
     upto = 0
@@ -38,8 +41,8 @@ def reconstruct(dist, verbose=False):
         get_weight = lambda item: props[item]["remaining"]
         return choose_biased(list(items), get_weight)
 
-    reps = [[degree] * count for degree, count in dist.iteritems()]
-    reps_flat = sum(reps, [])  # flatten list of lists
+    reps = [[degree] * count for degree, count in dist.items()]
+    reps_flat = list(chain.from_iterable(reps))
 
     for index, degree in enumerate(reps_flat):
         props[index] = {"degree": degree, "remaining": degree}
@@ -95,14 +98,13 @@ def reconstruct(dist, verbose=False):
         else:
             acc.add(dst)
 
-    nodes = range(counts)
+    nodes = list(range(counts))
     return Graph(nodes, edges)
 
 
 def print_dist(dist):
-    for degree in range(max(dist)+1):
-        count = dist[degree]
-        print "%d, %d" % (degree, count)
+    for degree, count in enumerate(dist):
+        print("%d, %d" % (degree, count))
 
 
 def read_dist(csv_file):
@@ -113,18 +115,34 @@ def read_dist(csv_file):
     return dist
 
 
+def get_dist_counts(dist):
+    """Return degree-indexed counts of a distribution.
+
+    `dist` can be a dict (degree -> count), as returned by read_dist, or a
+    degree-indexed array, as returned by calculate_dist.
+    """
+    if not isinstance(dist, dict):
+        return np.asarray(dist)
+    counts = np.zeros(max(dist) + 1, np.int64)
+    for degree, count in dist.items():
+        counts[degree] = count
+    return counts
+
+
 def print_dist_diff(dist1, dist2):
 
-    max1 = max(dist1.keys())
-    max2 = max(dist2.keys())
-    max_degree = max([max1, max2])
+    counts1 = get_dist_counts(dist1)
+    counts2 = get_dist_counts(dist2)
+    max_degree = max(len(counts1), len(counts2)) - 1
+    get_count = lambda counts, degree: \
+        counts[degree] if degree < len(counts) else 0
 
     for degree in range(max_degree+1):
-        c1 = dist1[degree]
-        c2 = dist2[degree]
+        c1 = get_count(counts1, degree)
+        c2 = get_count(counts2, degree)
         if c1 == c2:
             continue
-        print "%d -> [%d, %d]" % (degree, c1, c2)
+        print("%d -> [%d, %d]" % (degree, c1, c2))
 
 
 def main():
@@ -0,0 +1,19 @@
+#!/bin/bash
+
+# Build the C APL kernels (_apl.so) used by net.py when available
+
+set -e
+
+cd "$(dirname "$0")/.."
+
+${CC:-cc} \
+  -O3 \
+  -march=native \
+  -fPIC \
+  -shared \
+  -std=c99 \
+  -fopenmp \
+  -W \
+  -Wall \
+  -o _apl.so \
+  _apl.c